@@ -1,6 +1,6 @@
 from abc import ABC
 from collections import Counter
-from functools import partial
+from functools import partial, lru_cache
 import threading
 
 import tensorflow as tf
@@ -112,6 +112,15 @@ class LayerScope:
         self._stack.__exit__(exc_type, exc_val, exc_tb)
 
 
+@lru_cache(maxsize=None)
+def _init_arg_spec(layer_cls):
+    """ constructor argspec and argument names for a layer type, cached because it's needed for every layer instance
+    """
+    arg_spec = inspect.getfullargspec(layer_cls.__init__)
+    arg_names = frozenset(arg_spec.args[1:] + arg_spec.kwonlyargs)
+    return arg_spec, arg_names
+
+
 class LayerConfig:
     """ LayerConfig
 
@@ -147,8 +156,9 @@ class LayerConfig:
 
     def __init__(self, layer_cls, **kwargs):
         self.layer_cls = layer_cls
-        self.arg_spec: inspect.FullArgSpec = inspect.getfullargspec(layer_cls.__init__)
-        self.arg_names: Set[str] = set(self.arg_spec.args[1:] + self.arg_spec.kwonlyargs)
+        arg_spec, arg_names = _init_arg_spec(layer_cls)
+        self.arg_spec: inspect.FullArgSpec = arg_spec
+        self.arg_names: Set[str] = set(arg_names)
         self._validate_args(**kwargs)
         self.kwargs: Dict[str, Any] = kwargs
 
@@ -1027,6 +1037,10 @@ class Input(Layer):
                 self._value = tf.constant(0., dtype=self.dtype)
 
         with layer_scope(self):
+            # the sparse encoding of constant index inputs is computed once instead of on every call
+            if self.constant and self.n_active is not None:
+                self._sp_value = sparse_matrix_indices(self._value, num_cols=self.n_units, dtype=self.dtype)
+
             if not self.constant and self._value is not None:
                 if isinstance(self._value, tf.SparseTensor):
                     layer_state.slot = SparseVariable(initial_value=self._value,
@@ -1102,6 +1116,8 @@ class Input(Layer):
     def compute(self):
         with layer_scope(self):
             if self.n_active is not None:
+                if self.constant:
+                    return self._sp_value
                 return sparse_matrix_indices(self.value, num_cols=self.n_units, dtype=self.dtype)
             else:
                 return self.value
@@ -1478,6 +1494,8 @@ class Linear(Layer):
         transpose_weights (`bool`): if `True`, transposes the weights
         sparse_weights (`bool`): if True indicates we are using a sparse tensor instead of a tf.Variable for weights
         weight_norm (`bool`): if True weights are normalised
+        binary_input (`bool`): if True, the values of sparse inputs are ignored and every active index has weight 1
+            (e.g. for `Input` layers with `n_active`), which allows for a lookup without the weight multiplication
         dtype (`tf.DType`): type for layer variables
         name (`str`): layer name
         share_state_with (`Linear or None`): Linear layer with which we wish to share the state
@@ -1496,6 +1514,7 @@ class Linear(Layer):
                  transpose_weights=False,
                  sparse_weights=False,
                  weight_norm=False,
+                 binary_input=False,
                  shape=None,
                  dtype=tf.float32,
                  name="linear",
@@ -1532,6 +1551,7 @@ class Linear(Layer):
         self.transpose_weights = transpose_weights
         self.sparse_weights = sparse_weights
         self.weight_norm = weight_norm
+        self.binary_input = binary_input
         self.share_state_with = share_state_with
 
         super().__init__(inputs=input_layer,
@@ -1548,6 +1568,7 @@ class Linear(Layer):
                          transpose_weights=transpose_weights,
                          sparse_weights=sparse_weights,
                          weight_norm=weight_norm,
+                         binary_input=binary_input,
                          share_state_with=share_state_with
                          )
 
@@ -1655,12 +1676,13 @@ class Linear(Layer):
                                            b_is_sparse=self.sparse_weights,
                                            transpose_b=True)
                 else:
-
+                    # binary inputs have all values set to 1, so the lookup can ignore the values
                     lookup_sum = embedding_lookup_sparse(params=weights,
                                                          sp_tensor=sp_values,
                                                          # sp_ids=sp_indices,
                                                          # sp_weights=sp_values,
                                                          combiner="sum",
+                                                         weighted=not self.binary_input,
                                                          name=self.scoped_name + "_embeddings")
                 tensor = lookup_sum
             else:
@@ -1715,6 +1737,7 @@ class Linear(Layer):
                       sparse_weights=sparse_weights,
                       add_bias=self.add_bias,
                       weight_norm=self.weight_norm,
+                      binary_input=self.binary_input,
                       name=name,
                       share_state_with=share_state_with,
                       shape=shape)
@@ -2407,13 +2430,10 @@ class DropLookup(Layer):
             mask_shape = tf.stack([batch_size, tf.size(unique_ids)])
             unique_mask = tf.random.uniform(mask_shape, dtype=tf.float32)
 
-            batch_wise = tf.broadcast_to(tf.expand_dims(tf.range(batch_size), axis=-1),
-                                         tf.stack([batch_size, seq_size]))
             unique_batch_wise = tf.reshape(indices, [batch_size, seq_size])
 
-            # gather mask and convert it to binary mask
-            mask_indices = tf.stack([batch_wise, unique_batch_wise], axis=-1)
-            binary_mask = tf.floor(tf.gather_nd(unique_mask, mask_indices) + (1 - self.probability))
+            # gather mask (row by row) and convert it to binary mask
+            binary_mask = tf.floor(tf.gather(unique_mask, unique_batch_wise, batch_dims=1) + (1 - self.probability))
             if self.scale:
                 binary_mask /= (1 - self.probability)
 
@@ -3162,14 +3182,12 @@ class Lookup(Layer):
             # batch size is unknown for sparse lookups
             # y = xW
             if isinstance(input_tensor, tf.SparseTensor):
-                sp_dim = tf.cast(input_tensor.dense_shape[-1], tf.int32)
-
                 # ops.py 1D sparse lookups into 2D sparse lookup with 3 lookups
                 # similar to the semantics of 1D dense tensor lookups
                 if len(input_tensor.get_shape().as_list()) == 1:
-                    sp_batch_size = tf.shape(input_tensor.values)[0]
+                    sp_batch_size = tf.shape(input_tensor.values, out_type=tf.int64)[0]
                     sp_indices = matrix_indices(input_tensor.indices)
-                    sp_batch_dim = tf.cast(tf.stack([sp_batch_size, sp_dim]), tf.int64)
+                    sp_batch_dim = tf.stack([sp_batch_size, input_tensor.dense_shape[-1]])
                     input_tensor = tf.SparseTensor(sp_indices, input_tensor.values, sp_batch_dim)
 
                 sp_values = input_tensor
@@ -3898,8 +3916,13 @@ class Merge(Lambda):
 
         def merge_fn(*tensors):
             if self.weights is not None:
-                tensors = [tf.math.scalar_mul(self.weights[i], tensors[i]) for i in
-                           range(len(tensors))]
+                if self.merge_fn is tf.math.add_n and not any(isinstance(t, tf.SparseTensor) for t in tensors):
+                    # weighted sum as a single contraction of the weights with the stacked tensors
+                    weights = tf.convert_to_tensor(self.weights, dtype=tensors[0].dtype)
+                    output = tf.tensordot(weights, tf.stack(tensors), axes=[[0], [0]])
+                    return tf.cast(output, self.dtype)
+
+                tensors = [tf.math.scalar_mul(weight, tensor) for weight, tensor in zip(self.weights, tensors)]
 
             output = self.merge_fn(tensors)
             output = tf.cast(output, self.dtype)
@@ -3950,13 +3973,17 @@ class Add(Merge):
 
         def merge_add(tensors):
             # tensors = [as_tensor(tensor) for tensor in tensors]
+            # add_n sums all tensors in a single op but doesn't broadcast, use it only if all shapes are known to match
+            shapes = [tensor.shape for tensor in tensors]
+            if all(not isinstance(tensor, tf.SparseTensor) for tensor in tensors) and \
+                    all(shape.is_fully_defined() and shape == shapes[0] for shape in shapes):
+                return tf.math.add_n(tensors)
+
             res = tf.constant(0, dtype=self.dtype)
             for tensor in tensors:
                 res = res + tensor
             return res
 
-        # merge_add = tf.add_n
-
         super().__init__(*inputs,
                          n_units=n_units,
                          dtype=dtype,
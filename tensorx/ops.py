@@ -21,8 +21,8 @@ def sparse_ones(indices, dense_shape, dtype=tf.float32, name="sparse_ones"):
     with tf.name_scope(name=name):
         indices = as_tensor(indices, tf.int64)
         dense_shape = as_tensor(dense_shape, tf.int64)
-        indices_shape = indices.shape
-        values = tf.ones([indices_shape[0]], dtype)
+        # the static number of indices is unknown inside tf.function, so values are sized with the dynamic shape
+        values = tf.ones(tf.shape(indices, out_type=tf.int64)[:1], dtype)
         return tf.SparseTensor(indices, values, dense_shape)
 
 
@@ -84,17 +84,7 @@ def repeat(x, n, name="repeat"):
     """
     with tf.name_scope(name):
         x = tf.convert_to_tensor(x)
-        n = as_tensor(n, dtype=x.dtype)
-
-        shape = tf.shape(x, out_type=x.dtype)
-        flat_x = tf.reshape(x, [-1])
-
-        rep_x = tf.tile(tf.expand_dims(flat_x, -1), tf.stack([1, n]))
-
-        new_shape = tf.concat([shape[:-1, ], shape[-1:, ] * n], axis=-1)
-        rep_x = tf.reshape(rep_x, new_shape)
-
-    return rep_x
+        return tf.repeat(x, n, axis=-1)
 
 
 def matrix_indices(index_tensor, dtype=tf.int64, sort_indices=True, name="matrix_indices"):
@@ -116,20 +106,15 @@ def matrix_indices(index_tensor, dtype=tf.int64, sort_indices=True, name="matrix
             index_tensor = tf.expand_dims(index_tensor, 0)
 
         shape = tf.shape(index_tensor, out_type=dtype)
-        row_indices = tf.range(0, shape[0])
-        row_indices = repeat(row_indices, shape[-1])
+        row_indices = tf.repeat(tf.range(0, shape[0]), shape[-1])
 
-        # sort ascending
+        # sort ascending (index_tensor already has the output dtype)
         if sort_indices:
-            sorted_indices, _ = tf.nn.top_k(tf.cast(index_tensor, tf.int32),
-                                            k=tf.cast(shape[-1], tf.int32))
-            sorted_indices = tf.reverse(sorted_indices, axis=[-1])
-            col_indices = sorted_indices
+            col_indices = tf.sort(index_tensor, axis=-1, direction="ASCENDING")
         else:
             col_indices = index_tensor
 
         col_indices = tf.reshape(col_indices, [-1])
-        col_indices = tf.cast(col_indices, dtype)
 
         indices = tf.stack([row_indices, col_indices], axis=-1)
 
@@ -159,6 +144,26 @@ def dense_one_hot(column_indices, num_cols, dtype=tf.float32, reduce=True, name=
     """
     with tf.name_scope(name=name):
         column_indices = as_tensor(column_indices, tf.int64)
+
+        if column_indices.get_shape().ndims == 2 and reduce:
+            # counts the indices of each row directly instead of reducing a [b,n,num_cols] one-hot tensor
+            batch_size = tf.shape(column_indices, out_type=tf.int64)[0]
+            num_cols = as_tensor(num_cols, tf.int64)
+            rows = tf.repeat(tf.range(batch_size), tf.shape(column_indices)[-1])
+            cols = tf.reshape(column_indices, [-1])
+
+            # like tf.one_hot, indices outside [0, num_cols) have no encoding, negative segment ids are dropped
+            valid = tf.logical_and(tf.greater_equal(cols, 0), tf.less(cols, num_cols))
+            segment_ids = tf.where(valid, rows * num_cols + cols, -tf.ones_like(cols))
+            # integer counts are exact and deterministic (float segment sums use GPU atomics)
+            counts = tf.math.unsorted_segment_sum(tf.ones_like(cols, dtype=tf.int32),
+                                                  segment_ids,
+                                                  num_segments=batch_size * num_cols)
+            counts = tf.reshape(counts, tf.stack([batch_size, num_cols]))
+            static_cols = tf.get_static_value(num_cols)
+            counts.set_shape([column_indices.shape[0], static_cols if static_cols is None else int(static_cols)])
+            return tf.cast(counts, dtype)
+
         one_hot_dense = tf.one_hot(column_indices, depth=num_cols, dtype=dtype)
 
         if column_indices.get_shape().ndims >= 2 and reduce:
@@ -199,7 +204,8 @@ def sparse_matrix_indices(column_indices, num_cols, dtype=tf.float32, name="spar
         column_indices = as_tensor(column_indices, tf.int64)
         indices = matrix_indices(column_indices, dtype=tf.int64)
 
-        dense_shape = tf.cast([tf.shape(column_indices)[0], num_cols], dtype=tf.int64)
+        batch_size = tf.shape(column_indices, out_type=tf.int64)[0]
+        dense_shape = tf.stack([batch_size, as_tensor(num_cols, tf.int64)])
 
         return sparse_ones(indices, dense_shape, dtype)
 
@@ -550,8 +556,9 @@ def apply_gate(tensor, gate):
         tensor = as_tensor(tensor)
         gate = as_tensor(gate)
 
-        n_gates = tf.shape(gate)[-1]
-        n_units = tf.shape(tensor)[-1]
+        # use static dimensions when known to avoid computing the shapes in the graph
+        n_gates = gate.shape[-1] if gate.shape[-1] is not None else tf.shape(gate)[-1]
+        n_units = tensor.shape[-1] if tensor.shape[-1] is not None else tf.shape(tensor)[-1]
         feature_dim = n_units // n_gates
 
         if isinstance(tensor, tf.SparseTensor):
@@ -562,8 +569,7 @@ def apply_gate(tensor, gate):
             tensor_in = tf.reshape(tensor, [-1, n_gates, feature_dim])
             gated = tensor_in * tf.expand_dims(gate, -1)
 
-        out_shape = tf.stack([-1, n_units])
-        output = tf.reshape(gated, out_shape)
+        output = tf.reshape(gated, [-1, n_units])
 
         return output
 
@@ -611,6 +617,8 @@ class SparseVariable:
                  dtype=None,
                  name="sparse_var"):
         with tf.name_scope(name):
+            # values are kept in canonical order so that reads don't need to reorder them
+            initial_value = tf.sparse.reorder(initial_value)
             self.indices = tf.Variable(initial_value=initial_value.indices,
                                        trainable=False,
                                        dtype=tf.int64,
@@ -638,13 +646,13 @@ class SparseVariable:
         if len(sp_value.shape) != len(self.shape.value()):
             raise ValueError("cannot assign SparseTensor with Different dimensions")
 
+        sp_value = tf.sparse.reorder(sp_value)
         self.indices.assign(sp_value.indices)
         self.values.assign(sp_value.values)
         self.shape.assign(sp_value.dense_shape)
 
     def value(self):
-        sp = tf.SparseTensor(self.indices, self.values, self.shape)
-        return tf.sparse.reorder(sp)
+        return tf.SparseTensor(self.indices, self.values, self.shape)
 
 
 def to_sparse(tensor, name="to_sparse"):
@@ -684,11 +692,77 @@ def to_sparse(tensor, name="to_sparse"):
         return sp_tensor
 
 
+def _combine_embeddings(params, ids, segment_ids, weights, combiner, max_norm, weighted, name):
+    """ looks up and combines the embeddings for the given flat ids and segment (row) ids,
+    used by `embedding_lookup_sparse`.
+    """
+    if not weighted:
+        # gather only the unique rows so that the gradient w.r.t. params is an IndexedSlices, the sparse segment op
+        # then gathers and combines the gathered rows without materializing one embedding per id
+        unique_ids, idx = tf.unique(ids)
+        embeddings = tf.nn.embedding_lookup(params=params, ids=unique_ids, max_norm=max_norm)
+        if combiner == "sum":
+            return tf.math.sparse_segment_sum(embeddings, idx, segment_ids, name=name)
+        elif combiner == "mean":
+            return tf.math.sparse_segment_mean(embeddings, idx, segment_ids, name=name)
+        else:
+            return tf.math.sparse_segment_sqrt_n(embeddings, idx, segment_ids, name=name)
+
+    embeddings = tf.nn.embedding_lookup(
+        params=params,
+        ids=ids,
+        max_norm=max_norm)
+
+    # ***
+    # this second lookup causes problems because sparse gradients don't propagate though gather
+    # embeddings = embedding_lookup(embeddings, idx)
+    # embeddings, _ = gather_dynamic(embeddings, idx)
+    # ***
+
+    if weights.dtype != embeddings.dtype:
+        weights = tf.cast(weights, embeddings.dtype)
+
+    # Reshape weights to allow broadcast
+    ones = tf.fill(
+        tf.expand_dims(tf.rank(embeddings) - 1, 0), 1)
+    bcast_weights_shape = tf.concat(
+        [tf.shape(weights), ones], 0)
+
+    orig_weights_shape = weights.get_shape()
+    weights = tf.reshape(weights, bcast_weights_shape)
+
+    # Set the weight shape, since after reshaping to bcast_weights_shape,
+    # the shape becomes None.
+    if embeddings.get_shape().ndims is not None:
+        weights.set_shape(orig_weights_shape.concatenate(
+            [1 for _ in range(embeddings.get_shape().ndims - 1)]))
+
+    embeddings *= weights
+
+    if combiner == "sum":
+        embeddings = tf.math.segment_sum(embeddings, segment_ids, name=name)
+    elif combiner == "mean":
+        embeddings = tf.math.segment_sum(embeddings, segment_ids)
+        weight_sum = tf.math.segment_sum(weights, segment_ids)
+        embeddings = tf.math.divide_no_nan(embeddings, weight_sum, name=name)
+    elif combiner == "sqrtn":
+        embeddings = tf.math.segment_sum(embeddings, segment_ids)
+        weights_squared = tf.math.pow(weights, 2)
+        weight_sum = tf.math.segment_sum(weights_squared, segment_ids)
+        weight_sum_sqrt = tf.math.sqrt(weight_sum)
+        embeddings = tf.math.divide_no_nan(embeddings, weight_sum_sqrt, name=name)
+    else:
+        assert False, "Unrecognized combiner"
+
+    return embeddings
+
+
 # TODO check if this has been fixed from previous versions
 def embedding_lookup_sparse(params,
                             sp_tensor,
                             combiner=None,
                             max_norm=None,
+                            weighted=True,
                             name="embedding_lookup_sparse"):
     """Computes embeddings for the given ids and weights.
 
@@ -722,6 +796,9 @@ def embedding_lookup_sparse(params,
         max_norm: If not `None`, each embedding is clipped if its l2-norm is larger
         than this value, before combining.
 
+        weighted (`bool`): if `False`, the values of `sp_tensor` are ignored and each id has weight 1. Only the unique
+            ids are gathered and the combiner runs as a single sparse segment op over the gathered rows.
+
         name (`str`): op name
 
     Returns:
@@ -756,54 +833,7 @@ def embedding_lookup_sparse(params,
         ids = sp_tensor.indices[:, -1]
         # ids, idx = tf.unique(ids)
 
-        embeddings = tf.nn.embedding_lookup(
-            params=params,
-            ids=ids,
-            max_norm=max_norm)
-
-        # ***
-        # this second lookup causes problems because sparse gradients don't propagate though gather
-        # embeddings = embedding_lookup(embeddings, idx)
-        # embeddings, _ = gather_dynamic(embeddings, idx)
-        # ***
-
-        weights = sp_tensor.values
-        if weights.dtype != embeddings.dtype:
-            weights = tf.cast(weights, embeddings.dtype)
-
-        # Reshape weights to allow broadcast
-        ones = tf.fill(
-            tf.expand_dims(tf.rank(embeddings) - 1, 0), 1)
-        bcast_weights_shape = tf.concat(
-            [tf.shape(weights), ones], 0)
-
-        orig_weights_shape = weights.get_shape()
-        weights = tf.reshape(weights, bcast_weights_shape)
-
-        # Set the weight shape, since after reshaping to bcast_weights_shape,
-        # the shape becomes None.
-        if embeddings.get_shape().ndims is not None:
-            weights.set_shape(orig_weights_shape.concatenate(
-                [1 for _ in range(embeddings.get_shape().ndims - 1)]))
-
-        embeddings *= weights
-
-        if combiner == "sum":
-            embeddings = tf.math.segment_sum(embeddings, segment_ids, name=name)
-        elif combiner == "mean":
-            embeddings = tf.math.segment_sum(embeddings, segment_ids)
-            weight_sum = tf.math.segment_sum(weights, segment_ids)
-            embeddings = tf.math.divide_no_nan(embeddings, weight_sum, name=name)
-        elif combiner == "sqrtn":
-            embeddings = tf.math.segment_sum(embeddings, segment_ids)
-            weights_squared = tf.math.pow(weights, 2)
-            weight_sum = tf.math.segment_sum(weights_squared, segment_ids)
-            weight_sum_sqrt = tf.math.sqrt(weight_sum)
-            embeddings = tf.math.divide_no_nan(embeddings, weight_sum_sqrt, name=name)
-        else:
-            assert False, "Unrecognized combiner"
-
-        return embeddings
+        return _combine_embeddings(params, ids, segment_ids, sp_tensor.values, combiner, max_norm, weighted, name)
 
 
 def sparse_overlap(sp_tensor1, sp_tensor2, name="sparse_overlap"):
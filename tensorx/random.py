@@ -52,6 +52,10 @@ def bernoulli(shape, prob=0.5, seed=None, dtype=tf.float32, name="random_bernoul
         tensor (`Tensor`): tensor with the given input shape
     """
     with tf.name_scope(name=name):
+        # the outcome is deterministic, no need to sample
+        if isinstance(prob, (int, float)) and prob in (0, 1):
+            return tf.fill(shape, tf.constant(prob, dtype=dtype))
+
         # uniform [prob, 1.0 + prob)
         random_tensor = prob
         random_tensor += tf.random.uniform(
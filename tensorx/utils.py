@@ -621,7 +621,8 @@ def as_tensor(x, dtype=None):
     if dtype is not None:
         dtype = tf.dtypes.as_dtype(dtype)
     if not isinstance(x, tf.SparseTensor):
-        x = tf.convert_to_tensor(x)
+        # python values are converted directly to the target dtype if possible, avoiding a cast op
+        x = tf.convert_to_tensor(x, dtype_hint=dtype)
 
     if dtype is not None:
         if x.dtype != dtype:
@@ -120,6 +120,25 @@ def test_input_compile():
     assert tx.tensor_equal(fn(), tf.zeros([1, 4], dtype=tf.int32))
 
 
+def test_input_sparse_compile():
+    inputs = tx.Input(n_units=4, n_active=2, constant=False)
+    inputs.value = [[0, 2], [1, 3]]
+    fn = tf.function()(inputs.__call__)
+
+    expected = [[1, 0, 1, 0],
+                [0, 1, 0, 1]]
+    assert tx.tensor_equal(tf.sparse.to_dense(fn()), expected)
+
+
+def test_input_constant_sparse():
+    value = [[0, 2], [1, 3]]
+    x = tx.Input(value, n_active=2, n_units=4, constant=True)
+    expected = tx.sparse_matrix_indices(value, num_cols=4, dtype=tf.int64)
+
+    assert x() is x()
+    assert tx.tensor_equal(tf.sparse.to_dense(x()), tf.sparse.to_dense(expected))
+
+
 def test_input_3d():
     # we either create a 3d input or specify the shape
     data = np.ones([2, 2, 2], dtype=np.float32)
@@ -227,6 +246,16 @@ def test_linear():
     assert tx.tensor_equal(linear() * 2, linear2())
 
 
+def test_linear_binary_input():
+    inputs = tx.Input([[0, 2], [1, 3]], n_active=2, n_units=4, constant=True)
+    linear = tx.Linear(inputs, n_units=3, add_bias=False)
+    binary = tx.Linear(inputs, n_units=3, add_bias=False, binary_input=True, share_state_with=linear)
+
+    assert binary.config["binary_input"]
+    assert binary.reuse_with(inputs).binary_input
+    assert tx.tensor_all_close(linear(), binary())
+
+
 def test_linear_rank3():
     val = tf.constant([[[1], [1]], [[2], [2]]])
     x1 = tx.Input(val, dtype=tf.float32)
@@ -478,6 +507,31 @@ def test_merge_add_shape():
     assert add.shape[0] is None
 
 
+def test_add_broadcast():
+    x1 = tx.Constant([[1., 2.]], name="x1")
+    x2 = tx.Constant([[3., 4.], [5., 6.]], name="x2")
+
+    assert tx.tensor_equal(tx.Add(x2, x2)(), [[6., 8.], [10., 12.]])
+    assert tx.tensor_equal(tx.Add(x1, x2)(), [[4., 6.], [6., 8.]])
+
+
+def test_merge_weighted():
+    x1 = tx.Input([[1., 2.]], n_units=2, name="x1")
+    x2 = tx.Input([[3., 4.]], n_units=2, name="x2")
+
+    merge = tx.layers.Merge(x1, x2, weights=[0.5, 2.])
+    assert tx.tensor_equal(merge(), [[6.5, 9.]])
+
+    merge = tx.layers.Merge(x1, x2, weights=[0.5, 2.], merge_fn=lambda tensors: tf.concat(tensors, axis=-1))
+    assert tx.tensor_equal(merge(), [[0.5, 1., 6., 8.]])
+
+    # float weights are not silently truncated for integer inputs
+    x1 = tx.Input([[1, 2]], n_units=2, dtype=tf.int32, name="x1")
+    x2 = tx.Input([[3, 4]], n_units=2, dtype=tf.int32, name="x2")
+    with pytest.raises(TypeError):
+        tx.layers.Merge(x1, x2, weights=[0.5, 2.])()
+
+
 def test_module_reuse_order():
     x1 = tx.Input([[2.]], n_units=1, name="x1")
     x2 = tx.Input([[2.]], n_units=1, name="x2")
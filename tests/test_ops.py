@@ -46,6 +46,26 @@ def test_dropout_random_tensor():
     assert tx.tensor_equal(nonzero_indices1, nonzero_indices2)
 
 
+def test_dropout_return_mask():
+    """ the returned mask reproduces the dropout output when given as random_mask
+    """
+    x = tf.random.uniform([10, 4])
+
+    @tf.function(input_signature=[tf.TensorSpec([None, 4])])
+    def dynamic_dropout(tensor):
+        return tx.dropout(tensor, probability=0.5, scale=False, return_mask=True)
+
+    for scale in (True, False):
+        drop_x, mask = tx.dropout(x, probability=0.5, scale=scale, return_mask=True)
+        expected = tx.dropout(x, probability=0.5, random_mask=mask, scale=scale)
+
+        assert tx.tensor_equal(drop_x, expected)
+        assert tx.tensor_equal(mask, tf.math.floor(mask))
+
+    drop_x, mask = dynamic_dropout(x)
+    assert tx.tensor_equal(drop_x, x * mask)
+
+
 def test_dropout_unscaled():
     x = tf.ones([100, 100])
     keep_prob = 0.5
@@ -221,6 +241,19 @@ def test_sparse_matrix_indices():
     assert not tx.tensor_equal(dense1, expected_dense)
 
 
+def test_sparse_matrix_indices_compile():
+    x = tf.constant([[0, 1, 3],
+                     [1, 2, 3]], dtype=tf.int64)
+    expected_dense = [[1, 1, 0, 1],
+                      [0, 1, 1, 1]]
+
+    # the number of rows is unknown when the function is traced
+    fn = tf.function(input_signature=[tf.TensorSpec([None, 3], tf.int64)])(
+        lambda ids: tx.sparse_matrix_indices(ids, num_cols=4, dtype=tf.int32))
+
+    assert tx.tensor_equal(tf.sparse.to_dense(fn(x)), expected_dense)
+
+
 def test_to_sparse():
     c = [[1, 0], [2, 3]]
 
@@ -259,3 +292,77 @@ def test_filter_nd():
     sp_result = tx.filter_nd(tf.greater(inputs, 0), inputs)
     assert isinstance(sp_result, tf.SparseTensor)
     assert tx.tensor_equal(sp_result.values, [1, 2, 3, 4])
+
+
+def test_embedding_lookup_sparse_unweighted():
+    params = tf.random.uniform([4, 3])
+    sp_tensor = tx.sparse_matrix_indices([[0, 2], [1, 3]], num_cols=4)
+
+    weighted = tx.embedding_lookup_sparse(params, sp_tensor, combiner="sum")
+    unweighted = tx.embedding_lookup_sparse(params, sp_tensor, combiner="sum", weighted=False)
+    expected = tf.stack([params[0] + params[2], params[1] + params[3]])
+
+    assert tx.tensor_all_close(weighted, expected)
+    assert tx.tensor_all_close(unweighted, expected)
+
+    # values are ignored when weighted is False
+    sp_tensor = tf.SparseTensor(sp_tensor.indices, sp_tensor.values * 2, sp_tensor.dense_shape)
+    unweighted = tx.embedding_lookup_sparse(params, sp_tensor, combiner="mean", weighted=False)
+    assert tx.tensor_all_close(unweighted, expected / 2)
+
+
+def test_embedding_lookup_sparse_unweighted_gradient():
+    params = tf.Variable(tf.random.uniform([4, 3]))
+    sp_tensor = tx.sparse_matrix_indices([[0, 2], [2, 3]], num_cols=4)
+
+    with tf.GradientTape(persistent=True) as tape:
+        weighted = tx.embedding_lookup_sparse(params, sp_tensor, combiner="sum")
+        unweighted = tx.embedding_lookup_sparse(params, sp_tensor, combiner="sum", weighted=False)
+
+    grad_weighted = tape.gradient(weighted, params)
+    grad_unweighted = tape.gradient(unweighted, params)
+
+    assert isinstance(grad_unweighted, tf.IndexedSlices)
+    assert tx.tensor_all_close(tf.convert_to_tensor(grad_unweighted), tf.convert_to_tensor(grad_weighted))
+
+
+def test_dense_one_hot():
+    x = tf.constant([[0, 1, 1],
+                     [3, -1, 2]])
+    num_cols = 4
+
+    reduced = tx.dense_one_hot(x, num_cols)
+    expected = tf.reduce_sum(tf.one_hot(x, depth=num_cols), axis=1)
+
+    assert tx.tensor_equal(reduced, expected)
+    assert tx.tensor_equal(reduced, [[1., 2., 0., 0.],
+                                     [0., 0., 1., 1.]])
+
+    one_hot = tx.dense_one_hot(x, num_cols, reduce=False)
+    assert tx.tensor_equal(tf.shape(one_hot), [2, 3, 4])
+
+
+def test_dense_one_hot_static_shape():
+    x = tf.constant([[0, 1, 1],
+                     [3, -1, 2]])
+    reduced = tx.dense_one_hot(x, num_cols=4)
+    assert reduced.shape.as_list() == [2, 4]
+    assert reduced.dtype == tf.float32
+
+    @tf.function(input_signature=[tf.TensorSpec([2, None], tf.int32)])
+    def fn(indices):
+        reduced = tx.dense_one_hot(indices, num_cols=4, dtype=tf.int64)
+        assert reduced.shape.as_list() == [2, 4]
+        return reduced
+
+    assert tx.tensor_equal(fn(x), [[1, 2, 0, 0],
+                                   [0, 0, 1, 1]])
+
+
+def test_repeat():
+    x = tf.constant([[1, 2], [3, 4]])
+    rep_x = tx.repeat(x, 2)
+
+    assert tx.tensor_equal(rep_x, [[1, 1, 2, 2],
+                                   [3, 3, 4, 4]])
+    assert tx.tensor_equal(tx.repeat(tf.range(3, dtype=tf.int64), 2), [0, 0, 1, 1, 2, 2])
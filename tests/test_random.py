@@ -43,3 +43,11 @@ def test_sample_sigmoid():
     sample = tx.sample_sigmoid(logits, n_samples)
 
     assert tx.tensor_equal(tf.shape(sample), [n_samples] + shape)
+
+
+def test_random_bernoulli_deterministic():
+    ones = tx.random.bernoulli(shape=[2, 3], prob=1.)
+    zeros = tx.random.bernoulli(shape=[2, 3], prob=0)
+
+    assert tx.tensor_equal(ones, tf.ones([2, 3]))
+    assert tx.tensor_equal(zeros, tf.zeros([2, 3]))